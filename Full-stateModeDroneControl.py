@@ -22,18 +22,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <https://www.gnu.org/licenses/>.
 import logging
+import math
 import time
-import numpy as np
-from scipy.spatial.transform import Rotation as R
 
 import cflib.crtp
-from cflib.crazyflie import Crazyflie
 from cflib.crazyflie.log import LogConfig
-from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
-from cflib.crazyflie.syncLogger import SyncLogger
 from cflib.utils import uri_helper
 from cflib.positioning.motion_commander import MotionCommander
-from cflib.crazyflie.high_level_commander import HighLevelCommander
+
+from crazyflie_pool import get_scf
 
 # URI to the Crazyflie to connect to
 uri = uri_helper.uri_from_env(default='radio://0/80/2M/E7E7E7E7E7')
@@ -41,9 +38,20 @@ uri = uri_helper.uri_from_env(default='radio://0/80/2M/E7E7E7E7E7')
 # Only output errors from the logging framework
 logging.basicConfig(level=logging.ERROR)
 
+# 日志回调写入的最新姿态数据（首个数据包到达前默认为水平）
+latest_state = {'stabilizer.roll': 0.0, 'stabilizer.yaw': 0.0}
+
+def log_attitude_callback(timestamp, data, logconf):
+    """日志回调：缓存最新的姿态数据"""
+    latest_state.update(data)
+
 def initialize_logging(scf):
     """初始化姿态日志配置"""
-    log_conf = LogConfig(name='Attitude', period_in_ms=50)
+    # 复用连接时不沿用上一次运行的姿态，首个数据包到达前默认为水平
+    latest_state.clear()
+    latest_state.update({'stabilizer.roll': 0.0, 'stabilizer.yaw': 0.0})
+    
+    log_conf = LogConfig(name='Attitude', period_in_ms=20)  # 快于20Hz控制频率，保证姿态缓存新鲜
     log_conf.add_variable('stateEstimate.x', 'float')
     log_conf.add_variable('stateEstimate.y', 'float')
     log_conf.add_variable('stateEstimate.z', 'float')
@@ -52,6 +60,7 @@ def initialize_logging(scf):
     log_conf.add_variable('stabilizer.roll', 'float')
     
     scf.cf.log.add_config(log_conf)
+    log_conf.data_received_cb.add_callback(log_attitude_callback)
     return log_conf
 
 def fly_to_target_position(mc, target_x, target_y, target_z):
@@ -61,70 +70,86 @@ def fly_to_target_position(mc, target_x, target_y, target_z):
     
     # 检查是否到达目标位置
     tolerance = 0.1
+    tol2 = tolerance * tolerance  # 比较距离平方，省去开方
     while True:
-        current_x = mc._x
-        current_y = mc._y
-        current_z = mc._z
-        distance = np.sqrt((target_x - current_x)**2 + 
-                           (target_y - current_y)**2 + 
-                           (target_z - current_z)**2)
+        dx = target_x - mc._x
+        dy = target_y - mc._y
+        dz = target_z - mc._z
         
-        if distance < tolerance:
+        if dx * dx + dy * dy + dz * dz < tol2:
             print("抵达目标位置")
             break
         time.sleep(0.1)
 
 def euler_to_quaternion(roll, pitch, yaw):
-    """将欧拉角转换为四元数"""
-    rotation = R.from_euler('xyz', [roll, pitch, yaw], degrees=True)
-    return rotation.as_quat()  # 返回 [x, y, z, w]
+    """将欧拉角（度）转换为四元数，返回 (x, y, z, w)"""
+    r, p, y = map(math.radians, (roll, pitch, yaw))
+    cr, sr = math.cos(r * 0.5), math.sin(r * 0.5)
+    cp, sp = math.cos(p * 0.5), math.sin(p * 0.5)
+    cy, sy = math.cos(y * 0.5), math.sin(y * 0.5)
+    # 公共子式只算一次，乘法由16次减为12次
+    cp_cy, cp_sy = cp * cy, cp * sy
+    sp_cy, sp_sy = sp * cy, sp * sy
+    return (sr * cp_cy - cr * sp_sy,
+            cr * sp_cy + sr * cp_sy,
+            cr * cp_sy - sr * sp_cy,
+            cr * cp_cy + sr * sp_sy)
 
-def send_full_state_setpoint(scf, target_x, target_y, target_z, target_pitch):
+def euler_to_quaternion_batch(rolls, pitches, yaws):
+    """批量将欧拉角（度）转换为四元数，返回 (N, 4) 数组 [x, y, z, w]"""
+    import numpy as np  # 仅批量计算时需要，避免脚本启动时加载 numpy
+    r = np.radians(np.asarray(rolls, dtype=float)) * 0.5
+    p = np.radians(np.asarray(pitches, dtype=float)) * 0.5
+    y = np.radians(np.asarray(yaws, dtype=float)) * 0.5
+    cr, sr = np.cos(r), np.sin(r)
+    cp, sp = np.cos(p), np.sin(p)
+    cy, sy = np.cos(y), np.sin(y)
+    return np.stack([sr * cp * cy - cr * sp * sy,
+                     cr * sp * cy + sr * cp * sy,
+                     cr * cp * sy - sr * sp * cy,
+                     cr * cp * cy + sr * sp * sy], axis=-1)
+
+def send_full_state_setpoint(commander, state, target_x, target_y, target_z, target_pitch):
     """发送全状态设定点"""
-    commander = HighLevelCommander(scf)
-    cf = scf.cf
-    
-    # 获取当前姿态
-    with SyncLogger(scf, cf.log_config) as logger:
-        log_entry = next(logger)
-        data = log_entry[1]
-        current_roll = data['stabilizer.roll']
-        current_yaw = data['stabilizer.yaw']
-    
-    # 创建目标姿态（滚转保持不变，偏航保持不变）
-    target_roll = current_roll
-    target_yaw = current_yaw
+    # 获取当前姿态（由日志回调持续更新）
+    current_roll = state['stabilizer.roll']
+    current_yaw = state['stabilizer.yaw']
     
-    # 转换为四元数
-    q = euler_to_quaternion(target_roll, target_pitch, target_yaw)
+    # 创建目标姿态（滚转保持不变，偏航保持不变）并转换为四元数
+    qx, qy, qz, qw = euler_to_quaternion(current_roll, target_pitch, current_yaw)
     
-    # 速度设置为零（悬停）
-    vx, vy, vz = 0.0, 0.0, 0.0
-    
-    # 加速度设置为零
-    ax, ay, az = 0.0, 0.0, 0.0
-    
-    # 角速度设置为零
-    rate_roll, rate_pitch, rate_yaw = 0.0, 0.0, 0.0
-    
-    # 发送全状态设定点
+    # 发送全状态设定点（速度、加速度、角速度均为零，即悬停）
     commander.send_full_state_setpoint(
-        target_x, target_y, target_z,
-        vx, vy, vz,
-        ax, ay, az,
-        q[0], q[1], q[2], q[3],
-        rate_roll, rate_pitch, rate_yaw
+        (target_x, target_y, target_z),
+        (0.0, 0.0, 0.0),
+        (0.0, 0.0, 0.0),
+        (qx, qy, qz, qw),
+        0.0, 0.0, 0.0
     )
 
+def wait_next_period(next_t, period):
+    """按截止时间调度：睡眠到下一周期，扣除本周期的执行耗时，返回新的截止时间"""
+    next_t += period
+    sleep_for = next_t - time.perf_counter()
+    if sleep_for > 0:
+        time.sleep(sleep_for)
+        return next_t
+    # 严重超时则重新对齐，不做追赶
+    return time.perf_counter()
+
 def main():
     # 初始化驱动程序
     cflib.crtp.init_drivers()
     
-    with SyncCrazyflie(uri, cf=Crazyflie(rw_cache='./cache')) as scf:
-        # 初始化日志配置
-        log_conf = initialize_logging(scf)
-        scf.cf.log_config = log_conf
-        log_conf.start()
+    scf = get_scf(uri)
+    
+    # 初始化日志配置
+    log_conf = initialize_logging(scf)
+    log_conf.start()
+    
+    try:
+        # 全状态设定点通过底层commander发送
+        commander = scf.cf.commander
         
         # 定义目标位置
         target_x, target_y, target_z = 1.0, 0.5, 1.0
@@ -147,32 +172,37 @@ def main():
             print(f"切换到全状态模式，设定俯仰角 {target_pitch} 度")
             
             # 持续发送全状态设定点
-            start_time = time.time()
+            start_time = time.perf_counter()
             duration = 5.0  # 控制5秒
+            control_period = 0.05  # 20Hz控制频率
             
+            next_t = start_time
             try:
-                while time.time() - start_time < duration:
+                while time.perf_counter() - start_time < duration:
                     send_full_state_setpoint(
-                        scf, 
+                        commander, 
+                        latest_state, 
                         target_x, 
                         target_y, 
                         target_z, 
                         target_pitch
                     )
-                    time.sleep(0.05)  # 20Hz控制频率
+                    next_t = wait_next_period(next_t, control_period)
             except Exception as e:
                 print(f"控制错误: {str(e)}")
             
-            # 恢复水平姿态
+            # 恢复水平姿态（沿用同一调度节拍，持续1秒）
             print("恢复水平姿态")
             for _ in range(20):
-                send_full_state_setpoint(scf, target_x, target_y, target_z, 0.0)
-                time.sleep(0.05)
+                send_full_state_setpoint(commander, latest_state, target_x, target_y, target_z, 0.0)
+                next_t = wait_next_period(next_t, control_period)
             
             print("降落...")
             mc.land()
-        
+    finally:
+        # 连接可能被连接池复用，停止并删除本次的日志配置，避免日志块累积
         log_conf.stop()
+        log_conf.delete()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
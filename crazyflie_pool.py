@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+按 URI 复用 Crazyflie 连接
+
+在同一个解释器中多次运行脚本（如交互式调试）时，复用已打开的链路，
+省去重复的无线电枚举、固件版本协商和参数/日志 TOC 下载。
+进程退出时统一关闭所有连接。
+"""
+import atexit
+
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+
+_POOL = {}
+
+
+def get_scf(uri):
+    """返回指定 URI 的已连接 SyncCrazyflie，首次调用时建立连接"""
+    scf = _POOL.get(uri)
+    if scf is None or not scf.is_link_open():
+        scf = SyncCrazyflie(uri, cf=Crazyflie(rw_cache='./cache'))
+        scf.open_link()
+        _POOL[uri] = scf
+    return scf
+
+
+@atexit.register
+def close_all():
+    """关闭连接池中的所有连接"""
+    while _POOL:
+        _, scf = _POOL.popitem()
+        scf.close_link()
@@ -37,11 +37,11 @@ import math
 import time
 
 import cflib.crtp
-from cflib.crazyflie import Crazyflie
-from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
 from cflib.utils import uri_helper
 from cflib.utils.reset_estimator import reset_estimator
 
+from crazyflie_pool import get_scf
+
 # URI to the Crazyflie to connect to
 uri = uri_helper.uri_from_env(default='radio://0/80/2M/E7E7E7E7E7')
 
@@ -105,8 +105,8 @@ if __name__ == '__main__':
     # 180: negative X direction
     # 270: negative Y direction
 
-    with SyncCrazyflie(uri, cf=Crazyflie(rw_cache='./cache')) as scf:
-        set_initial_position(scf, initial_x, initial_y, initial_z, initial_yaw)
-        reset_estimator(scf)
-        run_sequence(scf, sequence,
-                     initial_x, initial_y, initial_z, initial_yaw)
+    scf = get_scf(uri)
+    set_initial_position(scf, initial_x, initial_y, initial_z, initial_yaw)
+    reset_estimator(scf)
+    run_sequence(scf, sequence,
+                 initial_x, initial_y, initial_z, initial_yaw)
@@ -8,11 +8,10 @@
 import logging
 import time
 import cflib.crtp
-from cflib.crazyflie import Crazyflie
 from cflib.crazyflie.log import LogConfig
-from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
 from cflib.crazyflie.syncLogger import SyncLogger
 from cflib.utils import uri_helper
+from crazyflie_pool import get_scf
 
 # 1. 无人机连接配置
 uri = uri_helper.uri_from_env(default='radio://0/80/2M/E7E7E7E7E7')
@@ -46,6 +45,10 @@ def simple_param_async(scf, groupstr, namestr):
     cf.param.set_value(full_name, 1)  # 设置参数值为1
     time.sleep(1)
 
+    # 连接可能被复用，移除本次添加的回调，避免重复注册
+    cf.param.remove_update_callback(group=groupstr, name=namestr,
+                                    cb=param_stab_est_callback)
+
 
 # 4. 日志数据回调函数
 def log_stab_callback(timestamp, data, logconf):
@@ -71,6 +74,7 @@ def simple_log_async(scf, logconf):
     logconf.start()  # 启动日志记录
     time.sleep(5)  # 持续记录5秒
     logconf.stop()  # 停止日志
+    logconf.delete()  # 删除日志配置，连接复用时避免日志块累积
 
 
 # 6. 同步日志记录函数
@@ -90,7 +94,7 @@ def simple_connect():
     """基础连接/断开功能演示"""
     print("连接成功!")
     time.sleep(3)  # 维持连接3秒
-    print("断开连接")
+    print("测试结束（连接在程序退出时关闭）")
 
 
 # 8. 主程序入口
@@ -108,12 +112,13 @@ if __name__ == '__main__':
     param_group = 'stabilizer'
     param_name = 'estimator'
 
-    # 建立同步连接
-    with SyncCrazyflie(uri, cf=Crazyflie(rw_cache='./cache')) as scf:
-        # 根据需要激活不同的功能：
-        # simple_connect()  # 基本连接测试
-        #simple_log(scf, lg_stab)  # 同步日志
-        simple_log_async(scf, lg_stab)  # 异步日志
+    # 建立同步连接（同一进程内按URI复用）
+    scf = get_scf(uri)
+
+    # 根据需要激活不同的功能：
+    # simple_connect()  # 基本连接测试
+    #simple_log(scf, lg_stab)  # 同步日志
+    simple_log_async(scf, lg_stab)  # 异步日志
 
-        # 实际执行的功能：异步参数操作
-        # simple_param_async(scf, param_group, param_name)
+    # 实际执行的功能：异步参数操作
+    # simple_param_async(scf, param_group, param_name)
@@ -4,9 +4,9 @@
 - 下箭头：减少油门
 - ESC键：安全退出程序
 """
+import asyncio
 import threading
 import time
-import sys
 from pynput import keyboard
 import cflib
 from cflib.crazyflie import Crazyflie
@@ -25,9 +25,11 @@ class DroneThrustControl:
         self.MAX_THRUST = 60000  # 最大油门（60%）
         
         # 状态标志
-        self._is_connected = False
-        self._is_running = False
-        self._control_thread = None
+        self._connected_event = threading.Event()  # 置位表示链路已连接
+        self._stop_event = threading.Event()  # 置位表示控制循环应退出
+        self._shutdown_once = threading.Event()  # 保证安全关闭只执行一次
+        self._loop = None  # 控制循环所在的事件循环
+        self._link_event = None  # 连接成功、失败或需要退出时置位
         self._listener = None
         
         # 注册回调
@@ -35,33 +37,60 @@ class DroneThrustControl:
         self._cf.disconnected.add_callback(self._disconnected)
         self._cf.connection_failed.add_callback(self._connection_failed)
         self._cf.connection_lost.add_callback(self._connection_lost)
+    
+    def run(self):
+        """连接无人机并运行控制，直到退出"""
+        asyncio.run(self._main())
+    
+    async def _main(self):
+        """控制、按键处理和关闭流程都在同一个事件循环中执行"""
+        self._loop = asyncio.get_running_loop()
+        self._link_event = asyncio.Event()
+        
+        print(f'正在连接到 {self.uri}...')
+        self._cf.open_link(self.uri)
         
-        print(f'正在连接到 {link_uri}...')
-        self._cf.open_link(link_uri)
+        try:
+            # 等待连接结果
+            await self._link_event.wait()
+            if self._stop_event.is_set():
+                return
+            
+            # 解锁无人机
+            if hasattr(self._cf.platform, 'send_arming_request'):
+                self._cf.platform.send_arming_request(True)
+            await asyncio.sleep(1)
+            
+            # 启动键盘监听
+            self._start_keyboard_listener()
+            
+            print("\n控制说明:")
+            print("↑ : 增加油门")
+            print("↓ : 减少油门")
+            print("ESC : 退出程序")
+            
+            await self._control_loop()
+            
+        except Exception as e:
+            print(f"控制循环错误: {e}")
+            
+        finally:
+            # 安全停止
+            await self._safe_shutdown()
     
     def _connected(self, link_uri):
         """成功连接后的回调"""
         print(f'成功连接到 {link_uri}')
-        self._is_connected = True
-        
-        # 解锁无人机
-        if hasattr(self._cf.platform, 'send_arming_request'):
-            self._cf.platform.send_arming_request(True)
-        time.sleep(1)
-        
-        # 启动控制线程
-        self._is_running = True
-        self._control_thread = threading.Thread(target=self._control_loop)
-        self._control_thread.daemon = True
-        self._control_thread.start()
-        
-        # 启动键盘监听
-        self._start_keyboard_listener()
-        
-        print("\n控制说明:")
-        print("↑ : 增加油门")
-        print("↓ : 减少油门")
-        print("ESC : 退出程序")
+        self._connected_event.set()
+        self._wake_loop()
+    
+    def _wake_loop(self):
+        """从其他线程唤醒事件循环"""
+        try:
+            self._loop.call_soon_threadsafe(self._link_event.set)
+        except RuntimeError:
+            # 事件循环已结束
+            pass
     
     def _start_keyboard_listener(self):
         """启动键盘监听器"""
@@ -70,8 +99,16 @@ class DroneThrustControl:
         self._listener.start()
     
     def _on_key_press(self, key):
-        """键盘按键处理"""
-        if not self._is_running or not self._is_connected:
+        """键盘监听线程回调：转交给事件循环处理"""
+        try:
+            self._loop.call_soon_threadsafe(self._handle_key, key)
+        except RuntimeError:
+            # 事件循环已结束
+            pass
+    
+    def _handle_key(self, key):
+        """键盘按键处理（在事件循环中执行）"""
+        if self._stop_event.is_set() or not self._connected_event.is_set():
             return
             
         try:
@@ -93,80 +130,84 @@ class DroneThrustControl:
             # 忽略特殊按键
             pass
     
-    def _control_loop(self):
+    async def _control_loop(self):
         """油门控制循环"""
-        try:
-            # 初始解锁保护
-            self._send_stop_command(5)
-            
-            # 主控制循环
-            while self._is_running:
-                # 发送当前油门值（roll/pitch/yaw=0）
-                self._cf.commander.send_setpoint(0, 0, 0, self.thrust)
-                time.sleep(0.05)  # 20Hz控制频率
-                
-        except Exception as e:
-            print(f"控制循环错误: {e}")
-            
-        finally:
-            # 安全停止
-            self._safe_shutdown()
+        # 初始解锁保护
+        await self._send_stop_command(5)
+        
+        # 主控制循环（20Hz，按截止时间调度以免执行耗时累积成频率漂移）
+        control_period = 0.05
+        
+        # 循环内用到的方法预先绑定到局部变量，省去每周期的属性查找
+        send_setpoint = self._cf.commander.send_setpoint
+        stopped = self._stop_event.is_set
+        sleep = asyncio.sleep
+        perf_counter = time.perf_counter
+        
+        next_t = perf_counter()
+        while not stopped():
+            # 发送当前油门值（roll/pitch/yaw=0）
+            send_setpoint(0, 0, 0, self.thrust)
+            next_t += control_period
+            sleep_for = next_t - perf_counter()
+            if sleep_for > 0:
+                await sleep(sleep_for)
+            else:
+                # 严重超时则重新对齐，不做追赶
+                next_t = perf_counter()
     
-    def _safe_shutdown(self):
-        """安全关闭无人机和连接"""
+    async def _safe_shutdown(self):
+        """安全关闭无人机和连接（重复调用时直接返回）"""
+        if self._shutdown_once.is_set():
+            return
+        self._shutdown_once.set()
+        
         print("执行安全关闭...")
         
         # 1. 发送停止命令
-        self._send_stop_command(30)
+        await self._send_stop_command(30)
         
         # 2. 关闭连接
-        if self._is_connected:
+        if self._connected_event.is_set():
             try:
                 self._cf.close_link()
             except Exception as e:
                 print(f"关闭连接时出错: {e}")
         
-        # 3. 停止线程
-        self._is_running = False
-        self._is_connected = False
+        # 3. 停止控制循环
+        self._stop_event.set()
+        self._connected_event.clear()
         
         # 4. 停止键盘监听
         if self._listener and self._listener.running:
             self._listener.stop()
     
-    def _send_stop_command(self, count):
+    async def _send_stop_command(self, count):
         """发送指定次数的停止命令"""
         for _ in range(count):
             try:
                 self._cf.commander.send_setpoint(0, 0, 0, 0)
-                time.sleep(0.1)
+                await asyncio.sleep(0.1)
             except Exception:
                 break
     
     def _quit_program(self):
-        """退出程序"""
-        self._is_running = False
-        
-        # 等待控制线程结束
-        if self._control_thread and self._control_thread.is_alive():
-            self._control_thread.join(timeout=2.0)
-        
-        # 退出程序
-        print("程序退出")
-        sys.exit(0)
+        """请求退出，控制循环结束后由 _main 执行安全关闭"""
+        self._stop_event.set()
+        self._wake_loop()
     
     def _connection_failed(self, link_uri, msg):
         print(f'连接失败: {link_uri}, 原因: {msg}')
-        self._safe_shutdown()
+        self._quit_program()
     
     def _connection_lost(self, link_uri, msg):
         print(f'连接丢失: {link_uri}, 原因: {msg}')
-        self._safe_shutdown()
+        self._quit_program()
     
     def _disconnected(self, link_uri):
         print(f'已断开连接: {link_uri}')
-        self._is_connected = False
-        self._is_running = False
+        self._connected_event.clear()
+        self._quit_program()
 
 if __name__ == '__main__':
     # 初始化驱动程序
@@ -175,12 +216,10 @@ if __name__ == '__main__':
     # 设置URI（这里使用默认URI，替换为您的实际URI）
     uri = uri_helper.uri_from_env(default='radio://0/80/2M/E7E7E7E7E7')
     
-    # 启动无人机控制
+    # 启动无人机控制（阻塞直到用户退出）
     controller = DroneThrustControl(uri)
-    
-    # 主线程等待（直到用户退出）
     try:
-        while True:
-            time.sleep(1)
+        controller.run()
     except KeyboardInterrupt:
-        controller._quit_program()
+        pass
+    print("程序退出")